@@ -1,10 +1,55 @@
-from flask import Flask
+from flask import Flask, g
+import click
+from markupsafe import Markup
 import os
 from dotenv import load_dotenv
-from app.extensions import db, login_manager
-from datetime import datetime
+from app.extensions import db, login_manager, cache
+import calendar
+import time
 import logging
 
+_MINUTE = 60
+_HOUR = 60 * _MINUTE
+_DAY = 24 * _HOUR
+_MONTH = 30 * _DAY
+_YEAR = 12 * _MONTH
+
+# (upper bound in seconds, unit in seconds, label) checked in order
+_TIMESINCE_STEPS = (
+    (_HOUR, _MINUTE, 'minutes'),
+    (_DAY, _HOUR, 'hours'),
+    (_MONTH, _DAY, 'days'),
+    (_YEAR, _MONTH, 'months'),
+)
+
+def _upgrade_schema():
+    """
+    Bring a database created by an earlier version up to the current models.
+    
+    db.create_all() skips tables that already exist, so indexes added to the
+    models later are created here and new nullable columns are added. Run
+    it once per deployment through `flask upgrade-db`, not from every worker
+    at startup, where concurrent ALTER TABLEs would race.
+    """
+    from app.dashboard.models import AnalysisSession, Visualization
+    
+    # Nullable columns added to the models after their tables were created
+    inspector = db.inspect(db.engine)
+    for model in (AnalysisSession, Visualization):
+        table = model.__table__
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable and column.server_default is None:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
+    
+    # Dashboard history listing (user_id, created_at DESC) and the
+    # per-session chart lookups of view/delete (session_id)
+    for model in (AnalysisSession, Visualization):
+        for index in model.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 def create_app():
     """Create and configure the Flask application."""
     load_dotenv()
@@ -20,14 +65,25 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///autovizai.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'query_cache_size': 1200,  # compiled-statement cache entries (default 500)
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
     app.config['ALLOWED_EXTENSIONS'] = {'csv'}
     app.config['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
+    # The dashboard session-list cache is opt-in: set CACHE_TYPE=RedisCache with
+    # CACHE_REDIS_URL. Per-process backends such as SimpleCache leave it off
+    app.config['CACHE_TYPE'] = os.getenv('CACHE_TYPE', 'NullCache')
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL')
+    app.config['CACHE_DEFAULT_TIMEOUT'] = 300
     
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
+    cache.init_app(app)
     login_manager.login_view = 'auth.login'
     
     # Import models here to avoid circular imports
@@ -54,34 +110,30 @@ def create_app():
     with app.app_context():
         db.create_all()
     
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Add indexes and columns introduced since the database was created."""
+        _upgrade_schema()
+        click.echo('Database schema is up to date.')
+    
     # Add timesince template filter
     @app.template_filter('timesince')
     def timesince_filter(dt):
         """Return a friendly timesince format."""
-        now = datetime.now()
-        diff = now - dt
-        
-        seconds = diff.total_seconds()
-        if seconds < 60:
-            return 'just now'
-        
-        minutes = seconds / 60
-        if minutes < 60:
-            return f'{int(minutes)} minutes ago'
-        
-        hours = minutes / 60
-        if hours < 24:
-            return f'{int(hours)} hours ago'
+        # One clock read per request, shared by every row in a listing
+        now_ts = g.get('now_ts')
+        if now_ts is None:
+            now_ts = g.now_ts = int(time.time())
         
-        days = hours / 24
-        if days < 30:
-            return f'{int(days)} days ago'
+        # Naive values come from the database's UTC CURRENT_TIMESTAMP
+        delta = now_ts - calendar.timegm(dt.utctimetuple())
+        if delta < 60:
+            return Markup('just now')
         
-        months = days / 30
-        if months < 12:
-            return f'{int(months)} months ago'
+        for limit, unit, label in _TIMESINCE_STEPS:
+            if delta < limit:
+                return Markup(f'{delta // unit} {label} ago')
         
-        years = months / 12
-        return f'{int(years)} years ago'
+        return Markup(f'{delta // _YEAR} years ago')
     
     return app
\ No newline at end of file
@@ -1,11 +1,2 @@
 from .models import User
-from .routes import auth_bp
-
-# Add the user loader function
-from flask_login import LoginManager
-
-login_manager = LoginManager()
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
\ No newline at end of file
+from .routes import auth_bp
\ No newline at end of file
@@ -8,7 +8,18 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///autovizai.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'query_cache_size': 1200,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'csv'}
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
\ No newline at end of file
+    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 30))  # seconds per API request
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+    # Opt-in dashboard session-list cache; needs a backend shared by all workers (RedisCache)
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'NullCache')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = 300
\ No newline at end of file
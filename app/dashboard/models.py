@@ -1,23 +1,39 @@
 # app/dashboard/models.py - UPDATED
 from app.extensions import db
 from flask_login import current_user
-from datetime import datetime
+from datetime import datetime, timezone
+
+def _utcnow():
+    """Naive UTC insert time, matching the DATETIME columns of existing databases."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class AnalysisSession(db.Model):
     """Stores user analysis sessions."""
     __tablename__ = 'analysis_sessions'
+    __table_args__ = (
+        # Serves the per-user history listing on the dashboard index in order
+        db.Index('ix_sessions_user_created', 'user_id', db.text('created_at DESC')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     filename = db.Column(db.String(256))
     dataset_stats = db.Column(db.Text)  # Store dataset statistics as JSON
     encoding_mappings = db.Column(db.Text)  # Store encoding mappings as JSON
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=_utcnow, nullable=False)
+    # Background chart generation: 'queued', 'running', 'done' or 'failed' (NULL for older sessions)
+    viz_status = db.Column(db.String(16))
+    viz_status_at = db.Column(db.DateTime)  # When viz_status last changed
     visualizations = db.relationship('Visualization', backref='session', lazy=True, cascade='all, delete-orphan')
 
 class Visualization(db.Model):
     """Stores generated visualizations and insights."""
     __tablename__ = 'visualizations'
+    __table_args__ = (
+        # On PostgreSQL the listing columns are covered by the index itself
+        db.Index('ix_viz_session', 'session_id',
+                 postgresql_include=['graph_type', 'x_column', 'y_column', 'created_at']),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('analysis_sessions.id', ondelete='CASCADE'))
@@ -25,6 +41,7 @@ class Visualization(db.Model):
     x_column = db.Column(db.String(128))
     y_column = db.Column(db.String(128), nullable=True)
     graph_path = db.Column(db.String(256))
-    insights = db.Column(db.Text)
-    graph_description = db.Column(db.Text)  # Store textual description for on-demand summaries
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    # Large text columns are deferred and only loaded when accessed or undeferred
+    insights = db.deferred(db.Column(db.Text))
+    graph_description = db.deferred(db.Column(db.Text))  # Store textual description for on-demand summaries
+    created_at = db.Column(db.DateTime, default=_utcnow, nullable=False)
\ No newline at end of file
@@ -1,55 +1,295 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort, send_from_directory
 from flask_login import login_required, current_user
 import os
-import pandas as pd
 import json
+import orjson
+import uuid
+import shutil
+import functools
+import calendar
+import time
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 from app.dashboard.models import AnalysisSession, Visualization
-from app.utils.data_utils import validate_csv, get_column_info, clean_dataframe, get_dataset_stats
-from app.utils.viz_utils import generate_visualization
-from app.utils.genai_utils import GenAIAnalyzer
-from app.extensions import db
+from app.extensions import db, cache
 import logging
 
+# pandas, matplotlib and openai are imported inside the views that need them
+# so importing the blueprint (and every worker cold start) stays cheap.
+
 logger = logging.getLogger(__name__)
 
 # Define the blueprint first
 dashboard_bp = Blueprint('dashboard', __name__, template_folder='templates/dashboard')
 
+# Shared pool for I/O-bound work (GenAI calls) that can overlap with rendering
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard')
+
+# Chart generation jobs run off the request path. They mostly wait on the
+# OpenAI API and the rendering process pool, so several run at once
+VIZ_JOB_WORKERS = int(os.getenv('VIZ_JOB_WORKERS', 4))
+_job_executor = ThreadPoolExecutor(max_workers=VIZ_JOB_WORKERS, thread_name_prefix='dashboard-job')
+
+# flask-caching backends private to one process. Deleting a key there leaves
+# other workers serving the stale entry, so the session list is not cached
+PROCESS_LOCAL_CACHE_TYPES = {'NullCache', 'SimpleCache', 'null', 'simple'}
+
+# Seconds after which a running job, or one still waiting for a worker, is
+# treated as lost (e.g. the process restarted) and no longer reported as processing
+VIZ_JOB_TIMEOUT = 600
+VIZ_QUEUE_TIMEOUT = 60 * 60
+
+# Seconds to wait for one chart to render before skipping it
+VIZ_RENDER_TIMEOUT = 120
+
+def _dump_json(data):
+    """Serialize dataset metadata for storage; numpy values and int keys are handled natively."""
+    return orjson.dumps(
+        data, default=str,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode('utf-8')
+
+def _load_json(text):
+    """Parse stored dataset metadata, including rows written by json.dumps with NaN literals."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+@functools.lru_cache(maxsize=64)
+def _column_stats(dataset_stats):
+    """Per-column min/max/mean stored with a session (None for sessions predating it)."""
+    return _load_json(dataset_stats).get('per_column')
+
+def _format_column_stats(stats):
+    """Format a column's min/max/mean for the summary prompt."""
+    return f"Range: {stats['min']:.1f}-{stats['max']:.1f}, Mean: {stats['mean']:.1f}"
+
+def _summary_stats(per_column, x_col, y_col):
+    """Build the x_stats/y_stats prompt lines for the plotted columns that have stats."""
+    data_stats = {}
+    # Columns without stats are non-numeric and get no range line
+    if x_col in per_column:
+        data_stats['x_stats'] = _format_column_stats(per_column[x_col])
+    
+    if y_col and y_col in per_column:
+        data_stats['y_stats'] = _format_column_stats(per_column[y_col])
+    return data_stats
+
+def _graph_dir(session_id):
+    """Directory holding the rendered graph images of a session."""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'viz', str(session_id))
+
+def _save_graph(graph_data, graph_dir):
+    """Write a rendered graph (PNG or SVG bytes) into graph_dir and return its filename."""
+    extension = 'svg' if graph_data.startswith(b'<svg') else 'png'
+    filename = f"{uuid.uuid4().hex}.{extension}"
+    with open(os.path.join(graph_dir, filename), 'wb') as f:
+        f.write(graph_data)
+    return filename
+
+def _session_list_key(user_id):
+    """Cache key of a user's rendered session list."""
+    return f'dashidx:{user_id}'
+
+def _session_list_cache_enabled():
+    """Whether the cache backend is shared, so every worker sees list invalidations."""
+    cache_type = current_app.config.get('CACHE_TYPE') or 'NullCache'
+    return cache_type.rsplit('.', 1)[-1] not in PROCESS_LOCAL_CACHE_TYPES
+
+def _invalidate_session_list(user_id):
+    """Drop a user's cached session list after their sessions change."""
+    if _session_list_cache_enabled():
+        cache.delete(_session_list_key(user_id))
+
+def _set_viz_status(session_id, status):
+    """Record a session's chart generation state on its row, visible to every worker process."""
+    db.session.execute(
+        db.update(AnalysisSession)
+        .where(AnalysisSession.id == session_id)
+        .values(viz_status=status, viz_status_at=db.func.now())
+    )
+    db.session.commit()
+
+def _viz_pending(session):
+    """Whether a session's charts are still queued or being generated."""
+    timeout = {'queued': VIZ_QUEUE_TIMEOUT, 'running': VIZ_JOB_TIMEOUT}.get(session.viz_status)
+    if timeout is None or session.viz_status_at is None:
+        return False
+    # Naive values come from the database's UTC CURRENT_TIMESTAMP
+    return time.time() - calendar.timegm(session.viz_status_at.utctimetuple()) < timeout
+
+def _collect_visualizations(session_id, jobs, graph_dir):
+    """Wait for rendered charts and build their Visualization rows, skipping failures."""
+    visualizations = []
+    for suggestion, insights, future in jobs:
+        try:
+            graph_data, graph_description = future.result(timeout=VIZ_RENDER_TIMEOUT)
+            
+            viz = Visualization(
+                session_id=session_id,
+                graph_type=suggestion['type'],
+                x_column=suggestion['x'],
+                y_column=suggestion.get('y'),
+                graph_path=_save_graph(graph_data, graph_dir),
+                insights=insights,
+                graph_description=graph_description
+            )
+            visualizations.append(viz)
+            logger.info(f"Created {suggestion['type']} visualization for {suggestion['x']}")
+        except TimeoutError:
+            logger.error(f"Visualization {suggestion.get('type', 'unknown')} did not render within {VIZ_RENDER_TIMEOUT}s")
+            continue
+        except Exception as e:
+            logger.error(f"Error generating visualization {suggestion.get('type', 'unknown')}: {str(e)}")
+            continue
+    return visualizations
+
+def _generate_visualizations(app, session_id, user_id, df_clean, column_info, dataset_stats):
+    """Render the essential and suggested charts of a session and store them (background job)."""
+    from app.utils.viz_utils import submit_visualization
+    from app.utils.genai_utils import get_analyzer
+    
+    with app.app_context():
+        status = 'failed'
+        try:
+            _set_viz_status(session_id, 'running')
+            
+            # Get visualization suggestions from GenAI while the essential plots render
+            analyzer = get_analyzer()
+            logger.info("Getting visualization suggestions...")
+            suggestions_future = _executor.submit(
+                analyzer.get_visualization_suggestions, column_info, dataset_stats
+            )
+            
+            # Always generate heatmap and box plots (essential visualizations)
+            essential_visualizations = [
+                {"type": "heatmap", "x": "all_numerical", "y": "all_numerical", "reason": "Correlation analysis"},
+                {"type": "box", "x": "all_numerical", "reason": "Outlier detection"}
+            ]
+            
+            graph_dir = _graph_dir(session_id)
+            os.makedirs(graph_dir, exist_ok=True)
+            
+            # (suggestion, placeholder insights, render future) in display order
+            jobs = []
+            for suggestion in essential_visualizations:
+                logger.info(f"Generating essential visualization: {suggestion['type']}")
+                jobs.append((
+                    suggestion,
+                    "Essential visualization - correlation and outlier analysis",
+                    submit_visualization(df_clean, suggestion['type'], suggestion['x'], suggestion.get('y'))
+                ))
+            
+            # Store the essential charts right away so the session page can show them
+            # while the LLM suggestions are still outstanding
+            db.session.bulk_save_objects(_collect_visualizations(session_id, jobs, graph_dir))
+            db.session.commit()
+            
+            suggestions = suggestions_future.result()
+            logger.info(f"Got {len(suggestions)} suggestions: {suggestions}")
+            
+            # Generate suggested visualizations (3-5 graphs)
+            jobs = []
+            for suggestion in suggestions[:5]:
+                # Validate suggestion structure
+                if not isinstance(suggestion, dict) or 'type' not in suggestion or 'x' not in suggestion:
+                    logger.warning(f"Invalid suggestion format: {suggestion}")
+                    continue
+                
+                logger.info(f"Generating suggested visualization: {suggestion['type']} for {suggestion['x']}")
+                jobs.append((
+                    suggestion,
+                    None,  # filled in by the summary batch below
+                    submit_visualization(df_clean, suggestion['type'], suggestion['x'], suggestion.get('y'))
+                ))
+            
+            visualizations = _collect_visualizations(session_id, jobs, graph_dir)
+            
+            # Pre-generate insights for the suggested charts with concurrent API calls
+            if visualizations:
+                per_column = dataset_stats.get('per_column', {})
+                summaries = analyzer.get_graph_summaries([
+                    {
+                        'graph_type': viz.graph_type,
+                        'x_col': viz.x_column,
+                        'y_col': viz.y_column,
+                        'graph_description': viz.graph_description,
+                        'data_stats': _summary_stats(per_column, viz.x_column, viz.y_column)
+                    }
+                    for viz in visualizations
+                ])
+                for viz, summary in zip(visualizations, summaries):
+                    # Failed calls keep the on-demand button
+                    viz.insights = summary or "Click 'Generate Insights' for AI analysis"
+            
+            db.session.bulk_save_objects(visualizations)
+            db.session.commit()
+            status = 'done'
+            logger.info(f"Visualizations for session {session_id} completed successfully")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error generating visualizations for session {session_id}: {str(e)}", exc_info=True)
+        finally:
+            try:
+                _set_viz_status(session_id, status)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Could not record visualization status for session {session_id}: {str(e)}")
+            _invalidate_session_list(user_id)
+
 @dashboard_bp.route('/')
 @login_required
 def index():
     """User dashboard showing analysis history."""
-    sessions = AnalysisSession.query.filter_by(user_id=current_user.id).order_by(AnalysisSession.created_at.desc()).all()
-    return render_template('dashboard/index.html', sessions=sessions)
+    if not _session_list_cache_enabled():
+        sessions = AnalysisSession.query.filter_by(user_id=current_user.id).order_by(AnalysisSession.created_at.desc()).all()
+        return render_template('dashboard/index.html', sessions=sessions)
+    
+    # Only the session list is cached; flashed messages are rendered around it
+    cache_key = _session_list_key(current_user.id)
+    session_list = cache.get(cache_key)
+    if session_list is None:
+        sessions = AnalysisSession.query.filter_by(user_id=current_user.id).order_by(AnalysisSession.created_at.desc()).all()
+        session_list = render_template('dashboard/_session_list.html', sessions=sessions)
+        cache.set(cache_key, session_list)
+    return render_template('dashboard/index.html', session_list=session_list)
 
 @dashboard_bp.route('/generate_summary/<int:viz_id>')
 @login_required
 def generate_summary(viz_id):
     """Generate AI summary on-demand for a specific visualization."""
-    viz = Visualization.query.get_or_404(viz_id)
-    session = AnalysisSession.query.get_or_404(viz.session_id)
+    viz = db.session.get(Visualization, viz_id) or abort(404)
+    session = db.session.get(AnalysisSession, viz.session_id) or abort(404)
     
     if session.user_id != current_user.id:
         return jsonify({'error': 'Permission denied'}), 403
     
     try:
-        # Load the original data to get statistics
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], session.filename)
-        df = pd.read_csv(filepath)
+        from app.utils.genai_utils import get_analyzer
         
         # Get basic statistics for the relevant columns
         data_stats = {}
-        if viz.x_column in df.columns:
-            x_stats = f"Range: {df[viz.x_column].min():.1f}-{df[viz.x_column].max():.1f}, Mean: {df[viz.x_column].mean():.1f}"
-            data_stats['x_stats'] = x_stats
-        
-        if viz.y_column and viz.y_column in df.columns:
-            y_stats = f"Range: {df[viz.y_column].min():.1f}-{df[viz.y_column].max():.1f}, Mean: {df[viz.y_column].mean():.1f}"
-            data_stats['y_stats'] = y_stats
+        per_column = _column_stats(session.dataset_stats) if session.dataset_stats else None
+        if per_column is not None:
+            data_stats = _summary_stats(per_column, viz.x_column, viz.y_column)
+        else:
+            import pandas as pd
+            
+            # Older sessions: load only the plotted columns from the original data
+            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], session.filename)
+            wanted = {viz.x_column, viz.y_column}
+            df = pd.read_csv(filepath, usecols=lambda col: col in wanted)
+            
+            # One aggregation call, shaped like the stored per-column stats
+            numeric = df.select_dtypes(include='number')
+            if not numeric.columns.empty:
+                column_stats = numeric.agg(['min', 'max', 'mean']).to_dict()
+                data_stats = _summary_stats(column_stats, viz.x_column, viz.y_column)
         
-        analyzer = GenAIAnalyzer()
+        analyzer = get_analyzer()
         summary = analyzer.get_graph_summary(
             viz.graph_type,
             viz.x_column,
@@ -71,6 +311,8 @@ def generate_summary(viz_id):
 def upload():
     """Handle file upload and initial processing."""
     if request.method == 'POST':
+        from app.utils.data_utils import validate_csv, prepare_dataset
+        
         if 'file' not in request.files:
             flash('No file selected', 'warning')
             return redirect(request.url)
@@ -82,18 +324,12 @@ def upload():
         
         if file and validate_csv(file.filename):
             filename = secure_filename(file.filename)
-            upload_dir = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_dir, exist_ok=True)
-            filepath = os.path.join(upload_dir, filename)
-            file.save(filepath)
+            # UPLOAD_FOLDER is created by the app factory
+            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
             
             try:
-                # Read the original data
-                df = pd.read_csv(filepath)
-                logger.info(f"Loaded CSV with shape: {df.shape}")
-                
-                # Get dataset statistics before cleaning
-                dataset_stats = get_dataset_stats(df)
+                # Save, parse and clean the upload (memoized by file content)
+                df_clean, encoding_mappings, dataset_stats, column_info = prepare_dataset(file.stream, filepath)
                 logger.info(f"Dataset stats type: {type(dataset_stats)}, keys: {list(dataset_stats.keys()) if isinstance(dataset_stats, dict) else 'N/A'}")
                 
                 # Validate dataset_stats is a dictionary
@@ -102,103 +338,41 @@ def upload():
                     flash('Error processing dataset statistics', 'danger')
                     return redirect(request.url)
                 
-                # Clean the data
-                df_clean, encoding_mappings = clean_dataframe(df)
                 logger.info(f"Cleaned data shape: {df_clean.shape}")
                 
                 # Create analysis session
                 session = AnalysisSession(
                     user_id=current_user.id,
                     filename=filename,
-                    dataset_stats=json.dumps(dataset_stats, default=str),
-                    encoding_mappings=json.dumps(encoding_mappings, default=str)
+                    dataset_stats=_dump_json(dataset_stats),
+                    encoding_mappings=_dump_json(encoding_mappings),
+                    viz_status='queued',
+                    viz_status_at=db.func.now()
                 )
                 db.session.add(session)
                 db.session.commit()
                 logger.info(f"Created session ID: {session.id}")
                 
-                # Get column information
-                column_info = get_column_info(df_clean)
-                logger.info(f"Column info: {[f'{col['name']}({col['type']})' for col in column_info]}")
-                
-                # Get visualization suggestions from GenAI
-                analyzer = GenAIAnalyzer()
-                logger.info("Getting visualization suggestions...")
-                suggestions = analyzer.get_visualization_suggestions(column_info, dataset_stats)
-                logger.info(f"Got {len(suggestions)} suggestions: {suggestions}")
+                logger.info(f"Column info: {[col['name'] + '(' + col['type'] + ')' for col in column_info]}")
                 
-                # Always generate heatmap and box plots (essential visualizations)
-                essential_visualizations = [
-                    {"type": "heatmap", "x": "all_numerical", "y": "all_numerical", "reason": "Correlation analysis"},
-                    {"type": "box", "x": "all_numerical", "reason": "Outlier detection"}
-                ]
-                
-                # Generate essential visualizations first
-                for suggestion in essential_visualizations:
-                    try:
-                        logger.info(f"Generating essential visualization: {suggestion['type']}")
-                        graph_data, graph_description = generate_visualization(
-                            df_clean, 
-                            suggestion['type'], 
-                            suggestion['x'], 
-                            suggestion.get('y')
-                        )
-                        
-                        viz = Visualization(
-                            session_id=session.id,
-                            graph_type=suggestion['type'],
-                            x_column=suggestion['x'],
-                            y_column=suggestion.get('y'),
-                            graph_path=graph_data,
-                            insights="Essential visualization - correlation and outlier analysis",
-                            graph_description=graph_description
-                        )
-                        db.session.add(viz)
-                        logger.info(f"Created {suggestion['type']} visualization")
-                    except Exception as e:
-                        logger.error(f"Error generating {suggestion['type']}: {str(e)}")
-                        flash(f"Error generating {suggestion['type']}: {str(e)}", 'warning')
-                        continue
-                
-                # Generate suggested visualizations (3-5 graphs)
-                for suggestion in suggestions[:5]:
-                    try:
-                        # Validate suggestion structure
-                        if not isinstance(suggestion, dict) or 'type' not in suggestion or 'x' not in suggestion:
-                            logger.warning(f"Invalid suggestion format: {suggestion}")
-                            continue
-                            
-                        logger.info(f"Generating suggested visualization: {suggestion['type']} for {suggestion['x']}")
-                        graph_data, graph_description = generate_visualization(
-                            df_clean, 
-                            suggestion['type'], 
-                            suggestion['x'], 
-                            suggestion.get('y')
-                        )
-                        
-                        viz = Visualization(
-                            session_id=session.id,
-                            graph_type=suggestion['type'],
-                            x_column=suggestion['x'],
-                            y_column=suggestion.get('y'),
-                            graph_path=graph_data,
-                            insights="Click 'Generate Insights' for AI analysis",
-                            graph_description=graph_description
-                        )
-                        db.session.add(viz)
-                        logger.info(f"Created {suggestion['type']} visualization for {suggestion['x']}")
-                    except Exception as e:
-                        logger.error(f"Error generating visualization {suggestion.get('type', 'unknown')}: {str(e)}")
-                        flash(f"Error generating visualization: {str(e)}", 'warning')
-                        continue
-                
-                db.session.commit()
-                flash('File uploaded and analyzed successfully!', 'success')
-                logger.info("File processing completed successfully")
+                # Render the charts in the background; the session page polls until they exist
+                _invalidate_session_list(current_user.id)
+                _job_executor.submit(
+                    _generate_visualizations,
+                    current_app._get_current_object(),
+                    session.id,
+                    current_user.id,
+                    df_clean,
+                    column_info,
+                    dataset_stats
+                )
+                flash('File uploaded successfully! Visualizations are being generated.', 'success')
                 return redirect(url_for('dashboard.view_session', session_id=session.id))
             
             except Exception as e:
                 db.session.rollback()
+                # The session row may already have been committed
+                _invalidate_session_list(current_user.id)
                 logger.error(f"Error processing file: {str(e)}", exc_info=True)
                 flash(f'Error processing file: {str(e)}', 'danger')
                 if os.path.exists(filepath):
@@ -211,16 +385,35 @@ def upload():
     
     return render_template('dashboard/upload.html')
 
+@dashboard_bp.route('/viz/<int:session_id>/<filename>')
+@login_required
+def graph_image(session_id, filename):
+    """Serve a rendered graph image; filenames are unique so it is cached forever."""
+    session = db.session.get(AnalysisSession, session_id) or abort(404)
+    if session.user_id != current_user.id:
+        abort(403)
+    
+    response = send_from_directory(_graph_dir(session_id), filename, max_age=31536000)
+    # Images belong to a logged-in user, so keep them out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
 @dashboard_bp.route('/session/<int:session_id>')
 @login_required
 def view_session(session_id):
     """View analysis session results."""
-    session = AnalysisSession.query.get_or_404(session_id)
+    session = db.session.get(
+        AnalysisSession, session_id,
+        # The session page shows every visualization's insights
+        options=[selectinload(AnalysisSession.visualizations).undefer(Visualization.insights)]
+    ) or abort(404)
     if session.user_id != current_user.id:
         flash('You do not have permission to view this session', 'danger')
         return redirect(url_for('dashboard.index'))
     
-    visualizations = Visualization.query.filter_by(session_id=session_id).all()
+    visualizations = session.visualizations
     
     # Parse dataset stats and encoding mappings
     dataset_stats = {}
@@ -228,9 +421,9 @@ def view_session(session_id):
     
     try:
         if session.dataset_stats:
-            dataset_stats = json.loads(session.dataset_stats)
+            dataset_stats = _load_json(session.dataset_stats)
         if session.encoding_mappings:
-            encoding_mappings = json.loads(session.encoding_mappings)
+            encoding_mappings = _load_json(session.encoding_mappings)
     except json.JSONDecodeError:
         flash('Error loading dataset information', 'warning')
     
@@ -238,13 +431,27 @@ def view_session(session_id):
                          session=session, 
                          visualizations=visualizations,
                          dataset_stats=dataset_stats,
-                         encoding_mappings=encoding_mappings)
+                         encoding_mappings=encoding_mappings,
+                         pending=_viz_pending(session))
+
+@dashboard_bp.route('/session/<int:session_id>/status')
+@login_required
+def session_status(session_id):
+    """Report whether a session's visualizations are still being generated."""
+    session = db.session.get(AnalysisSession, session_id) or abort(404)
+    if session.user_id != current_user.id:
+        return jsonify({'error': 'Permission denied'}), 403
+    
+    return jsonify({
+        'pending': _viz_pending(session),
+        'visualizations': Visualization.query.filter_by(session_id=session_id).count()
+    })
 
 @dashboard_bp.route('/dataset_info/<int:session_id>')
 @login_required
 def dataset_info(session_id):
     """View detailed dataset information."""
-    session = AnalysisSession.query.get_or_404(session_id)
+    session = db.session.get(AnalysisSession, session_id) or abort(404)
     if session.user_id != current_user.id:
         flash('You do not have permission to view this session', 'danger')
         return redirect(url_for('dashboard.index'))
@@ -255,9 +462,9 @@ def dataset_info(session_id):
     
     try:
         if session.dataset_stats:
-            dataset_stats = json.loads(session.dataset_stats)
+            dataset_stats = _load_json(session.dataset_stats)
         if session.encoding_mappings:
-            encoding_mappings = json.loads(session.encoding_mappings)
+            encoding_mappings = _load_json(session.encoding_mappings)
     except json.JSONDecodeError:
         flash('Error loading dataset information', 'warning')
     
@@ -270,7 +477,7 @@ def dataset_info(session_id):
 @login_required
 def delete_session(session_id):
     """Delete an analysis session."""
-    session = AnalysisSession.query.get_or_404(session_id)
+    session = db.session.get(AnalysisSession, session_id) or abort(404)
     if session.user_id != current_user.id:
         flash('You do not have permission to delete this session', 'danger')
         return redirect(url_for('dashboard.index'))
@@ -280,6 +487,8 @@ def delete_session(session_id):
         Visualization.query.filter_by(session_id=session_id).delete()
         db.session.delete(session)
         db.session.commit()
+        shutil.rmtree(_graph_dir(session_id), ignore_errors=True)
+        _invalidate_session_list(current_user.id)
         flash('Session deleted successfully', 'success')
     except Exception as e:
         db.session.rollback()
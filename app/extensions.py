@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_caching import Cache
 
 db = SQLAlchemy()
-login_manager = LoginManager()
\ No newline at end of file
+login_manager = LoginManager()
+cache = Cache()
\ No newline at end of file
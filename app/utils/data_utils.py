@@ -1,21 +1,119 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
-from sklearn.preprocessing import LabelEncoder
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, List, Dict, Tuple
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of prepared uploads kept in memory, keyed by content digest
+DATASET_CACHE_SIZE = 8
+
+# Buffer size for copying uploads to disk (shutil's default is 64 KiB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_dataset_cache = OrderedDict()
+_dataset_cache_lock = threading.Lock()
+
 def validate_csv(filename: str) -> bool:
     """Validate that the file has a CSV extension."""
     allowed_extensions = {'csv'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+class _TeeReader:
+    """Read-only file wrapper that copies every chunk it returns into a sink."""
+    
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self._source = source
+        self._sink = sink
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._source.read(size)
+        self._sink.write(chunk)
+        return chunk
+
+def save_and_read_csv(stream: BinaryIO, filepath: str) -> pd.DataFrame:
+    """
+    Persist an uploaded CSV to disk and parse it in a single pass.
+    
+    The upload stream is tee'd into the destination file while pandas reads it,
+    so the file is never re-read from disk after being saved.
+    
+    Args:
+        stream: Binary stream of the uploaded file
+        filepath: Destination path for the raw CSV
+        
+    Returns:
+        Parsed DataFrame
+    """
+    with open(filepath, 'wb') as sink:
+        df = pd.read_csv(_TeeReader(stream, sink))
+        # Copy anything the parser did not consume so the saved file is complete
+        shutil.copyfileobj(stream, sink, COPY_BUFFER_SIZE)
+    return df
+
+def hash_stream(stream: BinaryIO, chunk_size: int = COPY_BUFFER_SIZE) -> str:
+    """Return the blake2b digest of a seekable stream and rewind it."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        hasher.update(chunk)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+def prepare_dataset(stream: BinaryIO, filepath: str) -> Tuple[pd.DataFrame, Dict, Dict, List[Dict[str, str]]]:
+    """
+    Save an uploaded CSV and prepare it for analysis.
+    
+    Results are memoized by the file's content digest, so retrying the same
+    upload only copies it to disk and skips parsing and cleaning. Cached
+    objects are shared between requests and must not be mutated.
+    
+    Args:
+        stream: Seekable binary stream of the uploaded file
+        filepath: Destination path for the raw CSV
+        
+    Returns:
+        Tuple of (cleaned DataFrame, encoding mappings, dataset statistics, column info)
+    """
+    digest = hash_stream(stream)
+    with _dataset_cache_lock:
+        prepared = _dataset_cache.get(digest)
+        if prepared is not None:
+            _dataset_cache.move_to_end(digest)
+    
+    if prepared is not None:
+        logger.info(f"Reusing prepared dataset {digest}")
+        with open(filepath, 'wb') as f:
+            shutil.copyfileobj(stream, f, COPY_BUFFER_SIZE)
+        return prepared
+    
+    df = save_and_read_csv(stream, filepath)
+    logger.info(f"Loaded CSV with shape: {df.shape}")
+    
+    # Statistics and column types describe the raw data, so compute them
+    # before cleaning label-encodes the categorical columns as integers
+    dataset_stats = get_dataset_stats(df)
+    column_info = get_column_info(df)
+    df_clean, encoding_mappings = clean_dataframe(df)
+    prepared = (df_clean, encoding_mappings, dataset_stats, column_info)
+    
+    with _dataset_cache_lock:
+        _dataset_cache[digest] = prepared
+        if len(_dataset_cache) > DATASET_CACHE_SIZE:
+            _dataset_cache.popitem(last=False)
+    return prepared
+
 def get_column_info(df: pd.DataFrame) -> List[Dict[str, str]]:
     """
     Extract column names and types from DataFrame.
     
+    Call this on the raw frame: after clean_dataframe, categorical columns
+    hold integer codes and would be reported as numerical.
+    
     Args:
         df: Pandas DataFrame
         
@@ -23,14 +121,15 @@ def get_column_info(df: pd.DataFrame) -> List[Dict[str, str]]:
         List of dictionaries with 'name' and 'type' for each column
     """
     column_info = []
-    for col in df.columns:
-        dtype = str(df[col].dtype)
-        if 'object' in dtype or 'category' in dtype:
-            col_type = 'categorical'
-        elif 'datetime' in dtype:
+    # Read dtypes from the frame's metadata instead of materialising each column
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_datetime64_any_dtype(dtype):
             col_type = 'datetime'
-        else:
+        elif pd.api.types.is_numeric_dtype(dtype):
             col_type = 'numerical'
+        else:
+            # object, category and pandas' string dtypes
+            col_type = 'categorical'
         
         column_info.append({'name': col, 'type': col_type})
     
@@ -40,70 +139,110 @@ def clean_dataframe(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
     """
     Comprehensive data cleaning for the uploaded CSV.
     
+    The input DataFrame is cleaned in place (no defensive copy), so callers
+    must not reuse it afterwards.
+    
     Returns:
         Tuple of (cleaned DataFrame, encoding mappings)
     """
-    # Make a copy to avoid modifying original
-    df_clean = df.copy()
+    df_clean = df
     encoding_mappings = {}
     
     # Drop duplicate rows
-    df_clean = df_clean.drop_duplicates()
-    
-    # Fill missing values - fixed to avoid in-place operations on copies
-    for col in df_clean.columns:
-        if pd.api.types.is_numeric_dtype(df_clean[col]):
-            # Fill numerical columns with median
-            median_val = df_clean[col].median()
-            df_clean[col] = df_clean[col].fillna(median_val)
-        else:
-            # Fill categorical columns with mode
-            mode_val = df_clean[col].mode()
-            fill_value = mode_val[0] if not mode_val.empty else "Unknown"
-            df_clean[col] = df_clean[col].fillna(fill_value)
+    df_clean.drop_duplicates(inplace=True)
     
-    # Encode categorical columns using label encoding and store mappings
-    le = LabelEncoder()
-    categorical_cols = df_clean.select_dtypes(include=['object']).columns
+    # Fill missing values: median for numerical columns, mode for the rest
+    num = df_clean.select_dtypes(include=np.number)
+    if not num.empty:
+        df_clean[num.columns] = num.fillna(num.median())
+    
+    other = df_clean.select_dtypes(exclude=np.number)
+    if not other.empty:
+        modes = other.mode()
+        fill_values = modes.iloc[0] if not modes.empty else pd.Series(index=other.columns, dtype=object)
+        df_clean[other.columns] = other.fillna(fill_values.fillna("Unknown"))
+    
+    # Encode categorical columns as category codes and store mappings
+    # 'string' covers pandas' string dtype, which 'object' stops matching in pandas 3
+    categorical_cols = df_clean.select_dtypes(include=['object', 'string']).columns
     
     for col in categorical_cols:
-        # Store original values before encoding
-        df_clean[col] = df_clean[col].astype(str)
-        df_clean[col] = le.fit_transform(df_clean[col])
+        # Factorize first so only the distinct values are stringified, then
+        # sort the labels so codes match the previous label encoding
+        codes, uniques = pd.factorize(df_clean[col], use_na_sentinel=False)
+        categories, inverse = np.unique(np.asarray(uniques.astype(str), dtype=str), return_inverse=True)
+        df_clean[col] = inverse[codes].astype(np.int32)
         
         # Create mapping dictionary
-        encoding_mappings[col] = {
-            int(encoded): str(original) 
-            for encoded, original in zip(le.transform(le.classes_), le.classes_)
-        }
+        encoding_mappings[col] = dict(enumerate(map(str, categories)))
+    
+    # Downcast numerical columns (and the codes above) to the smallest dtype that fits
+    for kind, dtypes in (('integer', ['integer']), ('float', ['floating'])):
+        cols = df_clean.select_dtypes(include=dtypes).columns
+        if len(cols):
+            df_clean[cols] = df_clean[cols].apply(pd.to_numeric, downcast=kind)
     
     return df_clean, encoding_mappings
 
+def estimate_memory_usage(df: pd.DataFrame, sample_size: int = 1000) -> int:
+    """
+    Estimate a DataFrame's memory footprint without walking every string.
+    
+    Fixed-width columns are measured exactly; the per-row size of object and
+    string columns is extrapolated from an evenly spaced sample of rows.
+    
+    Args:
+        df: Pandas DataFrame
+        sample_size: Approximate number of rows to measure deeply
+        
+    Returns:
+        Estimated memory usage in bytes
+    """
+    total = int(df.memory_usage(deep=False).sum())
+    obj = df.select_dtypes(include=['object', 'string'])
+    if obj.empty:
+        return total
+    
+    sample = obj.iloc[::max(1, len(obj) // sample_size)]
+    extra = sample.memory_usage(deep=True, index=False).sum() - sample.memory_usage(deep=False, index=False).sum()
+    return total + int(extra * len(obj) / len(sample))
+
 def get_dataset_stats(df: pd.DataFrame) -> Dict:
     """Get comprehensive statistics about the dataset. Always returns a dict."""
     try:
         # Convert DataFrame to JSON-serializable format
-        head_data = {}
-        for col in df.columns:
-            head_data[col] = df[col].head().tolist()
+        head_data = df.head().to_dict(orient='list')
         
         describe_data = {}
+        per_column = {}
         if not df.select_dtypes(include=[np.number]).empty:
             desc = df.describe()
-            for stat in desc.index:
-                describe_data[stat] = desc.loc[stat].tolist()
+            describe_data = desc.T.to_dict(orient='list')
+            
+            # Flat lookup used by on-demand summaries instead of re-reading the CSV
+            for col in desc.columns:
+                if desc.at['count', col] > 0:
+                    per_column[col] = {
+                        'min': float(desc.at['min', col]),
+                        'max': float(desc.at['max', col]),
+                        'mean': float(desc.at['mean', col])
+                    }
+        
+        # One pass over the null mask serves every null/non-null count below
+        nulls = df.isnull().sum()
         
         stats = {
             'shape': list(df.shape),
-            'total_null_values': int(df.isnull().sum().sum()),
-            'column_null_values': df.isnull().sum().to_dict(),
+            'total_null_values': int(nulls.sum()),
+            'column_null_values': nulls.to_dict(),
             'dtypes': df.dtypes.astype(str).to_dict(),
             'head': head_data,
             'describe': describe_data,
+            'per_column': per_column,
             'info': {
                 'columns': list(df.columns),
-                'non_null_counts': df.count().to_dict(),
-                'memory_usage': int(df.memory_usage(deep=True).sum())
+                'non_null_counts': (len(df) - nulls).to_dict(),
+                'memory_usage': estimate_memory_usage(df)
             }
         }
         return stats
@@ -1,37 +1,219 @@
 from openai import OpenAI
 import json
+import orjson
+import copy
+import functools
+import hashlib
+import re
 from typing import List, Dict
 from app.config import Config
+from app.utils.viz_cache import MemoryTTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of distinct dataset schemas whose suggestions are kept in memory
+SUGGESTION_CACHE_SIZE = 256
+
+# Number of graph summaries kept in memory
+SUMMARY_CACHE_SIZE = 1024
+
+# Seconds a cached suggestion list or summary stays valid
+GENAI_CACHE_TTL = 24 * 60 * 60
+
+# Schemas with at most this many plottable columns get rule-based suggestions without an API call
+RULES_MAX_COLUMNS = 3
+
+# Part of every cache key; bump when a prompt template changes
+PROMPT_VERSION = 2
+
+# Body of the first markdown code fence; an unterminated fence runs to the end
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+
+# Patterns used to recover chart details from a prompt when building fallback insights
+_GRAPH_TYPE_RE = re.compile(r'\b(histogram|bar|line|pie|box|heatmap|violin)\b', re.IGNORECASE)
+_AXIS_RE = {
+    'x': re.compile(r"X-axis \(([^)]+)\)"),
+    'y': re.compile(r"Y-axis \(([^)]+)\)")
+}
+
+@functools.lru_cache(maxsize=SUGGESTION_CACHE_SIZE)
+def _split_schema(schema: tuple) -> tuple:
+    """Split (name, type) pairs into numerical and categorical name tuples in one pass."""
+    numerical, categorical = [], []
+    for name, col_type in schema:
+        if col_type == 'numerical':
+            numerical.append(name)
+        elif col_type == 'categorical':
+            categorical.append(name)
+    return tuple(numerical), tuple(categorical)
+
+def _split_columns(columns: List[Dict[str, str]]) -> tuple:
+    """
+    Return the numerical and categorical column names of a schema.
+    
+    Args:
+        columns: Column dicts with 'name' and 'type'
+        
+    Returns:
+        (numerical names, categorical names), memoized per schema
+    """
+    return _split_schema(tuple((col['name'], col['type']) for col in columns))
+
+@functools.lru_cache(maxsize=1)
+def get_analyzer() -> 'GenAIAnalyzer':
+    """Return the process-wide analyzer so its HTTP connection pool is reused across requests."""
+    return GenAIAnalyzer()
+
 class GenAIAnalyzer:
     """Handles all GenAI interactions for data analysis and visualization suggestions."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        # The OpenAI client is thread-safe and keeps a keep-alive connection pool,
+        # so one instance is shared between requests (see get_analyzer). The SDK's
+        # default read timeout is ten minutes; bound it so a stalled request
+        # cannot hold a worker thread that long
+        self.client = OpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            timeout=Config.OPENAI_TIMEOUT,
+            max_retries=Config.OPENAI_MAX_RETRIES
+        )
+        self._suggestion_cache = MemoryTTLCache(SUGGESTION_CACHE_SIZE, GENAI_CACHE_TTL, namespace='suggest:')
+        self._summary_cache = MemoryTTLCache(SUMMARY_CACHE_SIZE, GENAI_CACHE_TTL, namespace='summary:')
     
     def get_visualization_suggestions(self, columns: List[Dict[str, str]], dataset_stats) -> List[Dict]:
         """
         Get balanced visualization suggestions from GenAI based on column types.
         Excludes scatter plots as requested.
+        
+        Suggestions are memoized per schema, so uploading a dataset with the
+        same columns and a similar size skips the API call.
         """
+        # Small schemas leave the model nothing to choose; the rules give the same charts
+        numerical_cols, categorical_cols = _split_columns(columns)
+        plottable = len(numerical_cols) + len(categorical_cols)
+        if plottable <= RULES_MAX_COLUMNS:
+            logger.info(f"Using rules path for visualization suggestions ({plottable} plottable columns)")
+            return self._generate_fallback_suggestions(columns)
+        
         prompt = self._build_suggestion_prompt(columns, dataset_stats)
-        response = self._get_ai_response(prompt)
-        return self._parse_ai_response(response, columns)
+        cache_key = self._suggestion_cache_key(columns, dataset_stats)
+        
+        try:
+            # Concurrent uploads of the same schema share a single API call
+            suggestions = self._suggestion_cache.get_or_compute(
+                cache_key, lambda: self._parse_ai_response(
+                    self._get_ai_response(prompt, prompt_cache_key=f"viz-suggest-v{PROMPT_VERSION}"), columns
+                )
+            )
+        except json.JSONDecodeError:
+            # Fallback to reasonable suggestions based on column types (no scatter);
+            # not cached so the model is asked again next time
+            return self._generate_fallback_suggestions(columns)
+        
+        return copy.deepcopy(suggestions)
+    
+    def _suggestion_cache_key(self, columns: List[Dict[str, str]], dataset_stats) -> str:
+        """Hash the normalized schema, the order of magnitude of the row count and whether nulls exist."""
+        stats = dataset_stats if isinstance(dataset_stats, dict) else {}
+        shape = stats.get('shape', [0, 0])
+        rows = shape[0] if isinstance(shape, list) and len(shape) > 0 else 0
+        payload = json.dumps({
+            'cols': sorted((col['name'], col['type']) for col in columns),
+            'rows': int(rows).bit_length(),
+            'nulls': bool(stats.get('total_null_values')),
+            'v': PROMPT_VERSION
+        })
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _summary_cache_key(self, prompt: str) -> str:
+        """Hash a summary prompt, which embeds the graph type, columns, description and stats."""
+        return hashlib.blake2b(f"{PROMPT_VERSION}:{prompt}".encode('utf-8'), digest_size=16).hexdigest()
     
     def get_graph_summary(self, graph_type: str, x_col: str, y_col: str, graph_description: str, data_stats: Dict = None) -> str:
         """
         Generate a concise natural language summary for a generated graph.
         """
         prompt = self._build_summary_prompt(graph_type, x_col, y_col, graph_description, data_stats)
-        return self._get_ai_response(prompt, max_tokens=150)
+        context = {'graph_type': graph_type, 'x_col': x_col, 'y_col': y_col}
+        try:
+            return self._summary_cache.get_or_compute(
+                self._summary_cache_key(prompt),
+                lambda: self._request_ai_response(
+                    prompt, max_tokens=150, prompt_cache_key=self._summary_prompt_cache_key(graph_type), context=context
+                )
+            )
+        except Exception as e:
+            # API failures are not cached
+            logger.warning(f"OpenAI request failed, using fallback insights: {str(e)}")
+            return self.get_fallback_insights(**context)
+    
+    def get_graph_summaries(self, items: List[Dict]) -> List[str]:
+        """
+        Generate summaries for several graphs with a single API call.
+        
+        Args:
+            items: Dicts with the keyword arguments of get_graph_summary
+            
+        Returns:
+            One summary per item, or None where no summary could be produced
+            so the caller can keep offering on-demand generation
+        """
+        prompts = [self._build_summary_prompt(**item) for item in items]
+        keys = [self._summary_cache_key(prompt) for prompt in prompts]
+        summaries = [self._summary_cache.get(key) for key in keys]
+        
+        # Only cache misses go to the API
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if missing:
+            contexts = [
+                {'graph_type': items[i]['graph_type'], 'x_col': items[i]['x_col'], 'y_col': items[i].get('y_col')}
+                for i in missing
+            ]
+            responses = self._request_summary_batch([prompts[i] for i in missing], contexts)
+            for i, response in zip(missing, responses):
+                if response is not None:
+                    self._summary_cache.set(keys[i], response)
+                summaries[i] = response
+        return summaries
+    
+    def _request_summary_batch(self, prompts: List[str], contexts: List[Dict]) -> List[str]:
+        """Ask for all summaries in one JSON-mode completion, aligned to prompts (and their fallback contexts) by id."""
+        charts = "\n".join(f"### Chart {i}\n{prompt.strip()}\n" for i, prompt in enumerate(prompts, 1))
+        batch_prompt = f"""
+Write a summary for each chart below, following that chart's focus list.
+
+Respond with a JSON object of the form {{"summaries": [{{"id": 1, "summary": "..."}}]}}
+containing exactly one entry per chart, using the chart numbers as ids.
+
+---
+CHARTS:
+{charts}"""
+        try:
+            response = self.client.chat.completions.create(**self._chat_params(
+                batch_prompt,
+                max_tokens=150 * len(prompts),
+                prompt_cache_key=f"viz-summary-batch-v{PROMPT_VERSION}",
+                response_format={"type": "json_object"}
+            ))
+            entries = orjson.loads(response.choices[0].message.content).get('summaries', [])
+            by_id = {
+                int(entry['id']): str(entry['summary']).strip()
+                for entry in entries
+                if isinstance(entry, dict) and 'id' in entry and 'summary' in entry
+            }
+        except Exception as e:
+            logger.warning(f"Batched summary request failed: {str(e)}")
+            return [None] * len(prompts)
+        
+        return [
+            self._validate_response(by_id[i], prompt, context) if i in by_id else None
+            for i, (prompt, context) in enumerate(zip(prompts, contexts), 1)
+        ]
     
     def _build_suggestion_prompt(self, columns: List[Dict[str, str]], dataset_stats) -> str:
         """Build balanced prompt for visualization suggestions excluding scatter plots."""
-        numerical_cols = [col['name'] for col in columns if col['type'] == 'numerical']
-        categorical_cols = [col['name'] for col in columns if col['type'] == 'categorical']
+        numerical_cols, categorical_cols = _split_columns(columns)
         
         columns_info = f"""
 Numerical Columns: {', '.join(numerical_cols) if numerical_cols else 'None'}
@@ -41,8 +223,8 @@ Categorical Columns: {', '.join(categorical_cols) if categorical_cols else 'None
         # Handle both dict and string (JSON) input for dataset_stats
         if isinstance(dataset_stats, str):
             try:
-                dataset_stats = json.loads(dataset_stats)
-            except (json.JSONDecodeError, TypeError):
+                dataset_stats = orjson.loads(dataset_stats)
+            except orjson.JSONDecodeError:
                 logger.warning("dataset_stats is string but not valid JSON, using empty dict")
                 dataset_stats = {}
         elif not isinstance(dataset_stats, dict):
@@ -55,15 +237,11 @@ Categorical Columns: {', '.join(categorical_cols) if categorical_cols else 'None
         cols = shape[1] if isinstance(shape, list) and len(shape) > 1 else 0
         null_values = dataset_stats.get('total_null_values', 0)
         
+        # Static instructions first and dataset values last, so the prefix is
+        # identical across uploads and eligible for OpenAI's prompt caching
         return f"""
 You are an expert data analyst. Suggest 3-5 appropriate visualizations for this dataset.
 
-Dataset Info:
-- Rows: {rows}
-- Columns: {cols}
-- Null values: {null_values}
-{columns_info}
-
 IMPORTANT: 
 1. Do NOT suggest heatmap or box plots as they are automatically generated separately.
 2. Do NOT suggest scatter plots under any circumstances.
@@ -92,21 +270,23 @@ Examples:
 For numerical analysis: {{"type": "histogram", "x": "age", "reason": "Distribution analysis"}}
 For categorical: {{"type": "bar", "x": "category", "y": "sales", "reason": "Comparison across categories"}}
 
+---
+DATASET SPECIFIC:
+Dataset Info:
+- Rows: {rows}
+- Columns: {cols}
+- Null values: {null_values}
+{columns_info}
 """
     
     def _build_summary_prompt(self, graph_type: str, x_col: str, y_col: str, graph_description: str, data_stats: Dict = None) -> str:
         """Build graph-specific prompts for accurate insights."""
         
-        # Graph-specific prompt templates (scatter removed)
-        prompt_templates = {
+        # Graph-specific instructions (scatter removed). They form the static
+        # start of the prompt; the chart's own values follow at the end so
+        # repeated calls share a cacheable prefix
+        focus_templates = {
             'histogram': """
-Analyze this histogram showing distribution of {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Shape of distribution (normal, skewed, bimodal)
 - Data range and spread
@@ -116,13 +296,6 @@ Focus on:
 Provide 2-3 factual sentences about the data distribution.
 """,
             'bar': """
-Analyze this bar chart comparing {y} across categories of {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Which categories have highest/lowest values
 - Overall pattern across categories
@@ -132,13 +305,6 @@ Focus on:
 Provide 2-3 factual sentences about the comparisons shown.
 """,
             'line': """
-Analyze this line chart showing {y} over {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Overall trend (increasing, decreasing, fluctuating)
 - Any peaks, troughs, or patterns
@@ -148,13 +314,6 @@ Focus on:
 Provide 2-3 factual sentences about the trend shown.
 """,
             'pie': """
-Analyze this pie chart showing distribution of {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Largest and smallest segments
 - Overall balance of categories
@@ -164,13 +323,6 @@ Focus on:
 Provide 2-3 factual sentences about the proportional distribution.
 """,
             'box': """
-Analyze this box plot showing distribution of {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Median position and spread
 - Presence of outliers
@@ -180,13 +332,6 @@ Focus on:
 Provide 2-3 factual sentences about the distribution characteristics.
 """,
             'heatmap': """
-Analyze this correlation heatmap.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Strongest positive/negative correlations
 - Patterns in the correlation matrix
@@ -196,13 +341,6 @@ Focus on:
 Provide 2-3 factual sentences about the correlation patterns.
 """,
             'violin': """
-Analyze this violin plot showing distribution of {y} across {x}.
-
-Visual Description:
-{desc}
-
-{stats}
-
 Focus on:
 - Distribution shape across categories
 - Data density and spread
@@ -213,17 +351,31 @@ Provide 2-3 factual sentences about the distribution patterns.
 """
         }
         
+        chart_headers = {
+            'histogram': "Analyze this histogram showing distribution of {x}.",
+            'bar': "Analyze this bar chart comparing {y} across categories of {x}.",
+            'line': "Analyze this line chart showing {y} over {x}.",
+            'pie': "Analyze this pie chart showing distribution of {x}.",
+            'box': "Analyze this box plot showing distribution of {x}.",
+            'heatmap': "Analyze this correlation heatmap.",
+            'violin': "Analyze this violin plot showing distribution of {y} across {x}."
+        }
+        
         # Get the appropriate template or use default
-        template = prompt_templates.get(graph_type, """
-Analyze this {type} chart showing {x}{y}.
+        focus = focus_templates.get(graph_type, """
+Provide 2-3 factual sentences about what the chart displays.
+""")
+        header = chart_headers.get(graph_type, "Analyze this {type} chart showing {x}{y}.")
+        template = focus + """
+---
+CHART SPECIFIC:
+""" + header + """
 
 Visual Description:
 {desc}
 
 {stats}
-
-Provide 2-3 factual sentences about what the chart displays.
-""")
+"""
         
         # Prepare data stats
         stats_text = ""
@@ -241,93 +393,128 @@ Provide 2-3 factual sentences about what the chart displays.
             stats=stats_text
         )
     
-    def _get_ai_response(self, prompt: str, max_tokens: int = 200) -> str:
-        """Get response from OpenAI API."""
+    def _chat_params(self, prompt: str, max_tokens: int, prompt_cache_key: str = None, response_format: Dict = None) -> Dict:
+        """Build the chat completion arguments shared by every request."""
+        params = {
+            'model': "gpt-3.5-turbo",
+            'messages': [
+                {"role": "system", "content": "You are a data analyst providing accurate, factual insights based only on what the visualization shows. Be specific and avoid generalizations."},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': max_tokens,
+            'temperature': 0.3  # Low temperature for factual responses
+        }
+        if response_format:
+            params['response_format'] = response_format
+        if prompt_cache_key:
+            # Routes prompts sharing a prefix to the same cache; sent as a raw
+            # body field so older SDK versions accept it too
+            params['extra_body'] = {'prompt_cache_key': prompt_cache_key}
+        return params
+    
+    def _summary_prompt_cache_key(self, graph_type: str) -> str:
+        """Prompt-cache routing key shared by all summaries of one graph type."""
+        return f"viz-summary-{graph_type}-v{PROMPT_VERSION}"
+    
+    def _validate_response(self, result: str, prompt: str, context: Dict = None) -> str:
+        """
+        Replace empty or apologetic responses with fallback insights.
+        
+        Args:
+            result: Stripped model output
+            prompt: Prompt that produced it
+            context: get_fallback_insights arguments; recovered from the prompt when omitted
+        """
+        if len(result) < 20 or "sorry" in result.lower() or "error" in result.lower():
+            return self._fallback_for(prompt, context)
+        
+        return result
+    
+    def _fallback_for(self, prompt: str, context: Dict = None) -> str:
+        """Fallback insights for the chart a prompt describes."""
+        if context is None:
+            context = {
+                'graph_type': self._extract_graph_type(prompt),
+                'x_col': self._extract_column(prompt, 'x'),
+                'y_col': self._extract_column(prompt, 'y')
+            }
+        return self.get_fallback_insights(**context)
+    
+    def _get_ai_response(self, prompt: str, max_tokens: int = 200, prompt_cache_key: str = None, context: Dict = None) -> str:
+        """
+        Get response from OpenAI API.
+        
+        Transient failures (rate limits, timeouts, 5xx) are already retried by
+        the client with jittered exponential backoff honouring Retry-After
+        (see Config.OPENAI_MAX_RETRIES); only persistent failures fall back.
+        """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a data analyst providing accurate, factual insights based only on what the visualization shows. Be specific and avoid generalizations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.3  # Low temperature for factual responses
-            )
-            result = response.choices[0].message.content.strip()
-            
-            # Validate response
-            if len(result) < 20 or "sorry" in result.lower() or "error" in result.lower():
-                return self.get_fallback_insights(
-                    self._extract_graph_type(prompt),
-                    self._extract_column(prompt, 'x'),
-                    self._extract_column(prompt, 'y')
-                )
-            
-            return result
-            
+            return self._request_ai_response(prompt, max_tokens, prompt_cache_key, context)
         except Exception as e:
-            return self.get_fallback_insights('chart', 'data', None)
+            logger.warning(f"OpenAI request failed, using fallback insights: {str(e)}")
+            return self._fallback_for(prompt, context)
+    
+    def _request_ai_response(self, prompt: str, max_tokens: int = 200, prompt_cache_key: str = None, context: Dict = None) -> str:
+        """Get response from OpenAI API; errors propagate to the caller."""
+        response = self.client.chat.completions.create(**self._chat_params(prompt, max_tokens, prompt_cache_key))
+        result = response.choices[0].message.content.strip()
+        
+        # Validate response
+        return self._validate_response(result, prompt, context)
     
     def _extract_graph_type(self, prompt: str) -> str:
         """Extract graph type from prompt."""
-        for graph_type in ['histogram', 'bar', 'line', 'pie', 'box', 'heatmap', 'violin']:
-            if graph_type in prompt.lower():
-                return graph_type
-        return 'chart'
+        match = _GRAPH_TYPE_RE.search(prompt)
+        return match.group(1).lower() if match else 'chart'
     
     def _extract_column(self, prompt: str, axis: str) -> str:
         """Extract column name from prompt."""
-        import re
-        pattern = f"{axis.upper()}-axis \\(([^)]+)\\)"
-        match = re.search(pattern, prompt)
+        match = _AXIS_RE[axis].search(prompt)
         return match.group(1) if match else 'data'
     
     def _parse_ai_response(self, response: str, columns: List[Dict[str, str]]) -> List[Dict]:
-        """Parse the AI response with validation against actual columns."""
-        try:
-            # Extract JSON from response
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0].strip()
-                
-            suggestions = json.loads(response)
-            
-            # Filter out heatmap, box plots, and scatter plots
-            filtered_suggestions = [
-                s for s in suggestions 
-                if s.get('type') not in ['heatmap', 'box', 'scatter']
-            ]
-            
-            # Validate that suggested columns exist in the dataset
-            valid_suggestions = []
-            column_names = [col['name'] for col in columns]
+        """
+        Parse the AI response with validation against actual columns.
+        Raises json.JSONDecodeError if the response holds no valid JSON.
+        """
+        # Extract JSON from response
+        match = _FENCE_RE.search(response)
+        if match:
+            response = match.group(1)
+        
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        suggestions = orjson.loads(response)
+        
+        # Filter out heatmap, box plots, and scatter plots
+        filtered_suggestions = [
+            s for s in suggestions 
+            if s.get('type') not in ['heatmap', 'box', 'scatter']
+        ]
+        
+        # Validate that suggested columns exist in the dataset
+        valid_suggestions = []
+        column_names = [col['name'] for col in columns]
+        
+        for suggestion in filtered_suggestions:
+            # Check x column exists
+            if suggestion.get('x') not in column_names:
+                continue
             
-            for suggestion in filtered_suggestions:
-                # Check x column exists
-                if suggestion.get('x') not in column_names:
-                    continue
-                
-                # Check y column exists if specified
-                if suggestion.get('y') and suggestion.get('y') not in column_names:
-                    continue
-                
-                valid_suggestions.append(suggestion)
-                
-                # Limit to 5 suggestions
-                if len(valid_suggestions) >= 5:
-                    break
+            # Check y column exists if specified
+            if suggestion.get('y') and suggestion.get('y') not in column_names:
+                continue
             
-            return valid_suggestions
+            valid_suggestions.append(suggestion)
             
-        except json.JSONDecodeError:
-            # Fallback to reasonable suggestions based on column types (no scatter)
-            return self._generate_fallback_suggestions(columns)
+            # Limit to 5 suggestions
+            if len(valid_suggestions) >= 5:
+                break
+        
+        return valid_suggestions
     
     def _generate_fallback_suggestions(self, columns: List[Dict[str, str]]) -> List[Dict]:
         """Generate fallback suggestions based on column types (no scatter plots)."""
-        numerical_cols = [col['name'] for col in columns if col['type'] == 'numerical']
-        categorical_cols = [col['name'] for col in columns if col['type'] == 'categorical']
+        numerical_cols, categorical_cols = _split_columns(columns)
         
         suggestions = []
         
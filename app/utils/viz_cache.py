@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# Marks a cache miss, so None can be cached as a value
+_MISSING = object()
+
+class MemoryTTLCache:
+    """
+    Thread-safe in-process cache with LRU eviction and per-entry expiry.
+    
+    Expiry times are jittered so entries written together do not all expire
+    at once, and get_or_compute lets only one thread compute a missing key
+    while concurrent callers wait for its result.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, namespace: str = '', jitter: float = 0.1):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+            namespace: Prefix added to every key
+            jitter: Fraction of ttl by which each entry's lifetime is randomly varied
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self.jitter = jitter
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> threading.Event set when the computing thread finishes
+        self._lock = threading.RLock()
+    
+    def _key(self, key: Hashable) -> Hashable:
+        return f"{self.namespace}{key}" if self.namespace else key
+    
+    def _lookup(self, key: Hashable) -> Any:
+        """Return the live value for an already namespaced key (lock must be held)."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return _MISSING
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Insert an already namespaced key and evict past maxsize (lock must be held)."""
+        lifetime = self.ttl * (1 + random.uniform(-self.jitter, self.jitter))
+        self._data[key] = (time.monotonic() + lifetime, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if it is missing or expired."""
+        with self._lock:
+            value = self._lookup(self._key(key))
+        return default if value is _MISSING else value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key."""
+        with self._lock:
+            self._store(self._key(key), value)
+    
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        
+        Only one thread runs compute for a given key; others wait and reuse its
+        result. Exceptions from compute propagate and nothing is cached, so a
+        waiting thread retries the computation itself.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+        
+        Returns:
+            The cached or freshly computed value
+        """
+        key = self._key(key)
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    return value
+                
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    break
+            
+            # Another thread is computing this key; wait and look again
+            event.wait()
+        
+        try:
+            value = compute()
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+    
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
\ No newline at end of file
@@ -1,21 +1,202 @@
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+# Split long paths into chunks so dense line charts render without Agg overflow
+matplotlib.rcParams.update({'path.simplify': True, 'agg.path.chunksize': 10000})
+# Figures are built directly rather than through pyplot's global state,
+# so charts can be rendered from several threads at once
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
 import numpy as np
 import io
-import base64
-import seaborn as sns
-from typing import Optional, Tuple, Dict
+import os
+import hashlib
+import html
+import textwrap
+import multiprocessing
+from typing import Optional, Tuple, Dict, List
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.viz_cache import MemoryTTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
-def generate_visualization(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str] = None) -> Tuple[str, str]:
+# Rows handed to matplotlib/seaborn for point-based charts; more cannot be
+# told apart in a ~1000px wide PNG
+MAX_PLOT_POINTS = 10_000
+
+# Correlation heatmaps with more variables than this are drawn without cell labels
+HEATMAP_ANNOT_MAX = 15
+
+# Colors of pandas' box plots, which the outlier grid used to be drawn with
+_BOX_STYLE = {
+    'boxprops': {'color': 'C0'},
+    'whiskerprops': {'color': 'C0'},
+    'capprops': {'color': 'C0'},
+    'medianprops': {'color': 'C2'}
+}
+
+# Resolution of rendered charts; dashboard cards are scaled down anyway
+VIZ_DPI = int(os.getenv('VIZ_DPI', 80))
+
+# zlib level for chart PNGs; fast levels trade some file size for encode time
+PNG_COMPRESS_LEVEL = int(os.getenv('VIZ_PNG_COMPRESS_LEVEL', 1))
+
+# Error images are plain SVG so validation failures skip matplotlib entirely
+ERROR_IMAGE_LINE_WIDTH = 60
+_ERROR_SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="640" height="480" viewBox="0 0 640 480">'
+    '<rect width="100%" height="100%" fill="#ffffff"/>'
+    '<rect x="40" y="180" width="560" height="120" rx="8" fill="#ffffe0" fill-opacity="0.7"/>'
+    '<text y="50%" text-anchor="middle" dominant-baseline="middle" fill="red" '
+    'font-family="DejaVu Sans, sans-serif" font-size="16">{lines}</text>'
+    '</svg>'
+)
+
+# Rendered charts kept in memory, keyed by the plotted data and parameters
+RENDER_CACHE_SIZE = 64
+RENDER_CACHE_TTL = 60 * 60
+
+_render_cache = MemoryTTLCache(RENDER_CACHE_SIZE, RENDER_CACHE_TTL, namespace='render:')
+
+# Processes rendering charts in parallel; matplotlib holds the GIL while it
+# draws, so threads cannot render more than one chart at a time
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+# One reusable figure per rendering thread; each chart is fully written out
+# before the same thread draws the next one
+_thread_figures = threading.local()
+
+def _get_figure(figsize: Tuple[float, float]) -> Figure:
+    """Return this thread's figure, cleared, resized and with default subplot spacing."""
+    fig = getattr(_thread_figures, 'figure', None)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _thread_figures.figure = fig
+        return fig
+    
+    fig.clear()
+    # tight_layout() on a previous chart leaves its layout engine and spacing behind
+    fig.set_layout_engine(None)
+    fig.subplots_adjust(**{key: matplotlib.rcParams[f'figure.subplot.{key}']
+                           for key in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    fig.set_size_inches(figsize)
+    return fig
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """Return the shared rendering process pool, starting it on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # Never fork the multi-threaded web process; forkserver children start
+            # from a clean, single-threaded server instead
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                               mp_context=multiprocessing.get_context(method))
+        return _render_pool
+
+def _discard_render_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken rendering pool so the next chart starts a fresh one."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _plot_columns(df: pd.DataFrame, x_col: str, y_col: Optional[str]) -> List[str]:
+    """Columns a chart reads from df."""
+    if x_col == "all_numerical":
+        return list(df.select_dtypes(include=[np.number]).columns)
+    return [col for col in (x_col, y_col) if col and col in df.columns]
+
+def _render_cache_key(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str],
+                      columns: Optional[List[str]] = None) -> str:
+    """Fingerprint the columns a chart reads together with its parameters."""
+    if columns is None:
+        columns = _plot_columns(df, x_col, y_col)
+    
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((graph_type, x_col, y_col, columns, len(df))).encode('utf-8'))
+    if columns:
+        # Vectorized per-row hashes of just the plotted columns
+        hasher.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+def generate_visualization(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str] = None) -> Tuple[bytes, str]:
     """
     Generate visualization based on parameters with robust error handling.
-    Returns both image and textual description.
+    Returns both the image bytes (PNG, or SVG for error images) and a textual description.
+    
+    Results are memoized by a fingerprint of the plotted data, so the same
+    chart of the same data is only rendered once.
     """
+    return _render_cache.get_or_compute(
+        _render_cache_key(df, graph_type, x_col, y_col),
+        lambda: _render_visualization(df, graph_type, x_col, y_col)
+    )
+
+def submit_visualization(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str] = None) -> Future:
+    """
+    Render a chart in a worker process.
+    
+    Only the columns the chart reads are sent to the worker. Cached charts,
+    charts that fail validation and single-CPU hosts are handled in the
+    calling thread, as is every chart while the pool cannot be restarted.
+    
+    Args:
+        df: Cleaned dataset
+        graph_type: Chart type
+        x_col: X-axis column, or "all_numerical" for the essential charts
+        y_col: Optional Y-axis column
+        
+    Returns:
+        A future resolving to generate_visualization's (image bytes, description)
+    """
+    # Resolve the columns (a select_dtypes pass for the essential charts) once
+    columns = _plot_columns(df, x_col, y_col)
+    key = _render_cache_key(df, graph_type, x_col, y_col, columns)
+    cached = _render_cache.get(key)
+    
+    future = None
+    if cached is None and RENDER_WORKERS >= 2 and columns:
+        # A worker killed mid-render (OOM, a crash in matplotlib) breaks the whole
+        # pool; replace it once, then fall back to rendering in this thread
+        for _ in range(2):
+            pool = _get_render_pool()
+            try:
+                future = pool.submit(_render_visualization, df[columns], graph_type, x_col, y_col)
+                break
+            except BrokenProcessPool:
+                logger.warning("Chart rendering pool is broken, starting a new one")
+                _discard_render_pool(pool)
+    
+    if future is None:
+        future = Future()
+        try:
+            future.set_result(cached or generate_visualization(df, graph_type, x_col, y_col))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _store(done: Future) -> None:
+        if done.cancelled():
+            return
+        if isinstance(done.exception(), BrokenProcessPool):
+            _discard_render_pool(pool)
+        elif done.exception() is None:
+            _render_cache.set(key, done.result())
+    
+    future.add_done_callback(_store)
+    return future
+
+def _render_visualization(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str]) -> Tuple[bytes, str]:
+    """Render a chart and its description (uncached)."""
     # Validate input data
     if df.empty:
         return _generate_error_image("Empty dataset"), "Empty dataset - no data to visualize"
@@ -36,26 +217,21 @@ def generate_visualization(df: pd.DataFrame, graph_type: str, x_col: str, y_col:
         # Create the appropriate visualization
         fig, description = _create_figure_with_description(df, graph_type, x_col, y_col)
         
-        # Convert to base64 for HTML embedding
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        plt.close(fig)
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return f"data:image/png;base64,{image_base64}", description
+        # Encode to PNG; routes write the bytes straight to disk
+        return _to_png(fig, format='png', bbox_inches='tight', dpi=VIZ_DPI), description
     
     except Exception as e:
         logger.error(f"Error generating visualization: {str(e)}", exc_info=True)
         return _generate_error_image(f"Error generating visualization: {str(e)}"), f"Error: {str(e)}"
 
-def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str]) -> Tuple[plt.Figure, str]:
+def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: str, y_col: Optional[str]) -> Tuple[Figure, str]:
     """Create figure and generate detailed textual description."""
-    fig, ax = plt.subplots(figsize=(10, 7))
+    fig = _get_figure((10, 7))
+    ax = fig.subplots()
     description = ""
     
     if graph_type == 'histogram':
-        ax.hist(df[x_col].dropna(), bins=30, alpha=0.7, edgecolor='black')
+        _draw_histogram(ax, df[x_col], bins=30, alpha=0.7, edgecolor='black')
         ax.set_xlabel(x_col, fontsize=12)
         ax.set_ylabel('Frequency', fontsize=12)
         ax.set_title(f"Distribution of {x_col}", fontsize=14)
@@ -68,14 +244,13 @@ def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: st
         description += f"Mean: {stats['mean']:.1f}, Std: {stats['std']:.1f}. Skewness: {skew:.2f}."
         
     elif graph_type == 'bar' and y_col:
-        # Bar chart with categorical x and numerical y
-        if df[x_col].nunique() > 15:
-            # Aggregate for too many categories
-            top_categories = df[x_col].value_counts().head(15).index
-            plot_df = df[df[x_col].isin(top_categories)]
-            bar_data = plot_df.groupby(x_col)[y_col].mean().sort_values(ascending=False)
-        else:
-            bar_data = df.groupby(x_col)[y_col].mean().sort_values(ascending=False)
+        # Bar chart with categorical x and numerical y; one grouped pass gives
+        # both the means and the category sizes
+        grouped = df.groupby(x_col, observed=True, sort=False)[y_col].agg(['mean', 'size'])
+        if len(grouped) > 15:
+            # Keep the 15 most frequent categories
+            grouped = grouped.nlargest(15, 'size')
+        bar_data = grouped['mean'].sort_values(ascending=False)
         
         ax.bar(range(len(bar_data)), bar_data.values)
         ax.set_xlabel(x_col, fontsize=12)
@@ -91,7 +266,8 @@ def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: st
         
     elif graph_type == 'line' and y_col:
         # Line chart (assuming x is ordered)
-        ax.plot(df[x_col], df[y_col], marker='o', markersize=3, linewidth=2)
+        plot_df = _downsample(df, graph_type, x_col)
+        ax.plot(plot_df[x_col], plot_df[y_col], marker='o', markersize=3, linewidth=2)
         ax.set_xlabel(x_col, fontsize=12)
         ax.set_ylabel(y_col, fontsize=12)
         ax.set_title(f"{y_col} over {x_col}", fontsize=14)
@@ -112,23 +288,30 @@ def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: st
         description += f"Largest category: {value_counts.index[0]} ({value_counts.iloc[0]/value_counts.sum()*100:.1f}%)."
     
     elif graph_type == 'violin' and y_col:
-        # Violin plot for distribution across categories
-        if df[x_col].nunique() > 10:
-            top_categories = df[x_col].value_counts().head(10).index
-            plot_df = df[df[x_col].isin(top_categories)]
+        # Violin plot for distribution across categories; factorize once and
+        # keep the rows of the 10 most frequent categories
+        codes, uniques = pd.factorize(df[x_col])
+        n_categories = len(uniques)
+        if n_categories > 10:
+            counts = np.bincount(codes[codes >= 0], minlength=n_categories)
+            top_codes = np.argpartition(-counts, 10)[:10]
+            plot_df = df[np.isin(codes, top_codes)]
+            n_categories = 10
         else:
             plot_df = df
         
-        sns.violinplot(x=x_col, y=y_col, data=plot_df, ax=ax)
+        # seaborn (and the scipy it pulls in) is only needed for violin plots
+        import seaborn as sns
+        sns.violinplot(x=x_col, y=y_col, data=_downsample(plot_df, graph_type, x_col), ax=ax)
         ax.set_title(f"Distribution of {y_col} by {x_col}", fontsize=14)
-        plt.xticks(rotation=45)
+        ax.tick_params(axis='x', labelrotation=45)
         
         # Violin plot description
-        description = f"Violin plot showing distribution of {y_col} across {plot_df[x_col].nunique()} {x_col} categories."
+        description = f"Violin plot showing distribution of {y_col} across {n_categories} {x_col} categories."
         
     else:
         # Default fallback to histogram
-        ax.hist(df[x_col].dropna(), bins=20)
+        _draw_histogram(ax, df[x_col], bins=20)
         ax.set_xlabel(x_col, fontsize=12)
         ax.set_ylabel('Frequency', fontsize=12)
         ax.set_title(f"Distribution of {x_col}", fontsize=14)
@@ -136,7 +319,52 @@ def _create_figure_with_description(df: pd.DataFrame, graph_type: str, x_col: st
     
     return fig, description
 
-def _generate_correlation_heatmap(df: pd.DataFrame) -> Tuple[str, str]:
+def _to_png(fig: Figure, **savefig_kwargs) -> bytes:
+    """Render a figure to PNG bytes."""
+    buf = io.BytesIO()
+    fig.savefig(buf, pil_kwargs={'compress_level': PNG_COMPRESS_LEVEL, 'optimize': False}, **savefig_kwargs)
+    # getvalue() hands back the written bytes without a seek/read copy
+    return buf.getvalue()
+
+def _downsample(df: pd.DataFrame, graph_type: str, x_col: str, cap: int = MAX_PLOT_POINTS) -> pd.DataFrame:
+    """
+    Reduce the rows drawn for line and violin charts to about cap.
+    
+    Line charts are decimated, which keeps the order and the trend's shape;
+    violin plots are sampled proportionally within each category so every
+    distribution keeps its shape. Aggregating charts (histogram, bar, pie)
+    must see every row and are not passed through here.
+    
+    Args:
+        df: Rows that would be plotted
+        graph_type: Chart type
+        x_col: Category column for violin plots
+        cap: Approximate maximum number of rows to keep
+        
+    Returns:
+        The original DataFrame if it is small enough, otherwise a subset
+    """
+    if len(df) <= cap:
+        return df
+    
+    if graph_type == 'violin':
+        return df.groupby(x_col, observed=True).sample(frac=cap / len(df), random_state=0)
+    return df.iloc[::len(df) // cap + 1]
+
+def _draw_histogram(ax, series: pd.Series, bins: int, **bar_kwargs) -> None:
+    """Bin a column with NumPy and draw the counts as bars (same look as ax.hist)."""
+    if not pd.api.types.is_numeric_dtype(series):
+        # Non-numeric data: one bar per category
+        counts = series.value_counts(sort=False)
+        ax.bar(counts.index.astype(str), counts.to_numpy(), **bar_kwargs)
+        return
+    
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **bar_kwargs)
+
+def _generate_correlation_heatmap(df: pd.DataFrame) -> Tuple[bytes, str]:
     """Generate correlation heatmap for all numerical columns."""
     try:
         # Select only numerical columns
@@ -144,44 +372,53 @@ def _generate_correlation_heatmap(df: pd.DataFrame) -> Tuple[str, str]:
         if len(numerical_cols) < 2:
             return _generate_error_image("Not enough numerical columns for heatmap"), "Insufficient numerical columns (need at least 2) for correlation analysis"
         
-        corr_matrix = df[numerical_cols].corr()
-        
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0, 
-                   square=True, ax=ax, fmt='.2f', cbar_kws={"shrink": .8})
+        # One contiguous float block; np.corrcoef is a single BLAS pass
+        values = df[numerical_cols].to_numpy(dtype=np.float64)
+        if np.isnan(values).any():
+            # Pairwise-complete correlation needs pandas' NaN handling
+            corr_matrix = df[numerical_cols].corr()
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr_matrix = pd.DataFrame(np.corrcoef(values, rowvar=False),
+                                           index=numerical_cols, columns=numerical_cols)
+        
+        # A single image artist instead of a mesh; cell labels only while they stay readable
+        corr_values = corr_matrix.to_numpy()
+        n_vars = len(numerical_cols)
+        fig = _get_figure((10, 8))
+        ax = fig.subplots()
+        image = ax.imshow(corr_values, cmap='coolwarm', vmin=-1, vmax=1, aspect='equal')
+        fig.colorbar(image, ax=ax, shrink=.8)
+        if n_vars <= HEATMAP_ANNOT_MAX:
+            for (i, j), value in np.ndenumerate(corr_values):
+                if not np.isnan(value):
+                    ax.text(j, i, f"{value:.2f}", ha='center', va='center',
+                            color='white' if abs(value) > 0.6 else 'black')
+        ax.set_xticks(range(n_vars))
+        ax.set_xticklabels(numerical_cols, rotation=45, ha='right')
+        ax.set_yticks(range(n_vars))
+        ax.set_yticklabels(numerical_cols)
         ax.set_title('Correlation Heatmap', fontsize=14, pad=20)
-        plt.xticks(rotation=45, ha='right')
-        plt.yticks(rotation=0)
         
         # Generate concise description
         description = f"Correlation heatmap showing relationships between {len(numerical_cols)} numerical variables. "
         
-        # Find strongest correlations
-        strong_corrs = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_val = corr_matrix.iloc[i, j]
-                if abs(corr_val) > 0.7:
-                    strong_corrs.append((corr_matrix.columns[i], corr_matrix.columns[j], corr_val))
+        # Count strongly correlated pairs in the upper triangle (NaN compares False)
+        with np.errstate(invalid='ignore'):
+            n_strong = int(np.triu(np.abs(corr_matrix.to_numpy()) > 0.7, k=1).sum())
         
-        if strong_corrs:
-            description += f"Strong correlations found between {min(3, len(strong_corrs))} variable pairs."
+        if n_strong:
+            description += f"Strong correlations found between {min(3, n_strong)} variable pairs."
         else:
             description += "No strong correlations detected."
         
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        plt.close(fig)
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return f"data:image/png;base64,{image_base64}", description
+        return _to_png(fig, format='png', bbox_inches='tight', dpi=VIZ_DPI), description
         
     except Exception as e:
         logger.error(f"Error generating heatmap: {str(e)}")
         return _generate_error_image(f"Heatmap error: {str(e)}"), f"Heatmap generation failed: {str(e)}"
 
-def _generate_outlier_boxplots(df: pd.DataFrame) -> Tuple[str, str]:
+def _generate_outlier_boxplots(df: pd.DataFrame) -> Tuple[bytes, str]:
     """Generate box plots for outlier detection in numerical columns."""
     try:
         numerical_cols = df.select_dtypes(include=[np.number]).columns
@@ -195,7 +432,8 @@ def _generate_outlier_boxplots(df: pd.DataFrame) -> Tuple[str, str]:
         n_cols = min(3, len(numerical_cols))
         n_rows = (len(numerical_cols) + n_cols - 1) // n_cols
         
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(12, 4*n_rows))
+        fig = _get_figure((12, 4*n_rows))
+        axes = fig.subplots(n_rows, n_cols)
         fig.suptitle('Outlier Detection - Box Plots', fontsize=14, y=0.98)
         
         # Flatten axes array for easier indexing
@@ -205,28 +443,38 @@ def _generate_outlier_boxplots(df: pd.DataFrame) -> Tuple[str, str]:
             axes = [axes] if n_cols == 1 else axes
         
         description = f"Box plots showing outlier detection for {len(numerical_cols)} numerical variables. "
-        outlier_counts = {}
+        
+        # Box statistics and IQR outliers for all columns in one vectorized pass;
+        # matplotlib then only draws them (same 1.5 * IQR whisker rule as boxplot)
+        values = df[numerical_cols].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            Q1, median, Q3 = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+            IQR = Q3 - Q1
+            outlier_mask = (values < (Q1 - 1.5 * IQR)) | (values > (Q3 + 1.5 * IQR))
+            inliers = np.where(outlier_mask, np.nan, values)
+            # Whiskers reach the most extreme values inside the fences, or the box edge if there are none
+            whislo = np.nan_to_num(np.nanmin(inliers, axis=0), nan=Q1)
+            whishi = np.nan_to_num(np.nanmax(inliers, axis=0), nan=Q3)
+        outlier_counts = dict(zip(numerical_cols, outlier_mask.sum(axis=0).tolist()))
         
         for idx, col in enumerate(numerical_cols):
             if idx < len(axes):
                 ax = axes[idx]
-                df[col].plot(kind='box', ax=ax)
+                ax.bxp([{
+                    'label': col,
+                    'q1': Q1[idx], 'med': median[idx], 'q3': Q3[idx],
+                    'whislo': whislo[idx], 'whishi': whishi[idx],
+                    'fliers': values[outlier_mask[:, idx], idx]
+                }], **_BOX_STYLE)
                 ax.set_title(col, fontsize=12)
                 ax.grid(True, alpha=0.3)
-                
-                # Count outliers
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                outliers = df[(df[col] < (Q1 - 1.5 * IQR)) | (df[col] > (Q3 + 1.5 * IQR))]
-                outlier_counts[col] = len(outliers)
         
         # Remove empty subplots
         for idx in range(len(numerical_cols), len(axes)):
             if idx < len(axes):
                 fig.delaxes(axes[idx])
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Generate concise description
         total_outliers = sum(outlier_counts.values())
@@ -235,37 +483,22 @@ def _generate_outlier_boxplots(df: pd.DataFrame) -> Tuple[str, str]:
             top_outliers = sorted(outlier_counts.items(), key=lambda x: x[1], reverse=True)[:2]
             description += f"Most outliers in {top_outliers[0][0]}."
         
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        plt.close(fig)
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return f"data:image/png;base64,{image_base64}", description
+        return _to_png(fig, format='png', bbox_inches='tight', dpi=VIZ_DPI), description
         
     except Exception as e:
         logger.error(f"Error generating box plots: {str(e)}")
         return _generate_error_image(f"Box plot error: {str(e)}"), f"Box plot generation failed: {str(e)}"
 
-def _generate_error_image(message: str) -> Tuple[str, str]:
-    """Generate an error image with the given message."""
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.text(0.5, 0.5, message, 
-            horizontalalignment='center', 
-            verticalalignment='center', 
-            transform=ax.transAxes,
-            fontsize=14,
-            color='red',
-            bbox=dict(boxstyle="round,pad=0.3", facecolor="lightyellow", alpha=0.7))
-    ax.set_axis_off()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    
-    return f"data:image/png;base64,{image_base64}", message
+def _generate_error_image(message: str) -> bytes:
+    """Return an SVG image showing the given error message (no matplotlib involved)."""
+    lines = textwrap.wrap(message, ERROR_IMAGE_LINE_WIDTH) or ['']
+    # Center the block of lines vertically around the middle of the image
+    first_dy = -(len(lines) - 1) * 0.6
+    tspans = ''.join(
+        f'<tspan x="50%" dy="{first_dy if i == 0 else 1.2}em">{html.escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return _ERROR_SVG_TEMPLATE.format(lines=tspans).encode('utf-8')
 
 def get_data_stats_for_insights(df: pd.DataFrame, x_col: str, y_col: str = None) -> Dict:
     """Get statistics for insights generation."""